@@ -0,0 +1,29 @@
+"""add refresh token rotated_at partial index
+
+Revision ID: 8d2e4b6a1c95
+Revises: 51eb42f5babc
+Create Date: 2026-10-16 11:02:17.884105
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '8d2e4b6a1c95'
+down_revision: Union[str, Sequence[str], None] = '51eb42f5babc'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # only rotated tokens are swept by rotated_at, keep the index to those rows
+    op.create_index('idx_refresh_token_rotated_at', 'refresh_tokens', ['rotated_at'], unique=False, postgresql_where=sa.text('is_rotated = true'))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('idx_refresh_token_rotated_at', table_name='refresh_tokens')
@@ -0,0 +1,42 @@
+"""store refresh token hashes instead of raw tokens
+
+Revision ID: c41f7e09ab23
+Revises: 8d2e4b6a1c95
+Create Date: 2026-10-16 13:26:52.417390
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c41f7e09ab23'
+down_revision: Union[str, Sequence[str], None] = '8d2e4b6a1c95'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('refresh_tokens', sa.Column('token_hash', sa.String(length=64), nullable=True))
+    # backfill existing rows, must match app.core.security.hash_token
+    op.execute("UPDATE refresh_tokens SET token_hash = encode(sha256(convert_to(token, 'UTF8')), 'hex')")
+    op.alter_column('refresh_tokens', 'token_hash', nullable=False)
+    op.create_index(op.f('ix_refresh_tokens_token_hash'), 'refresh_tokens', ['token_hash'], unique=True)
+    # lookups only use token_hash, the raw token no longer needs to be stored
+    op.drop_index(op.f('ix_refresh_tokens_token'), table_name='refresh_tokens')
+    op.drop_column('refresh_tokens', 'token')
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    # raw tokens cannot be recovered from their hashes; the hash keeps the column
+    # unique and non-null, existing sessions have to log in again
+    op.add_column('refresh_tokens', sa.Column('token', sa.Text(), nullable=True))
+    op.execute("UPDATE refresh_tokens SET token = token_hash")
+    op.alter_column('refresh_tokens', 'token', nullable=False)
+    op.create_index(op.f('ix_refresh_tokens_token'), 'refresh_tokens', ['token'], unique=True)
+    op.drop_index(op.f('ix_refresh_tokens_token_hash'), table_name='refresh_tokens')
+    op.drop_column('refresh_tokens', 'token_hash')
@@ -0,0 +1,31 @@
+"""refresh token active and history indexes
+
+Revision ID: e7b35d10f8c2
+Revises: c41f7e09ab23
+Create Date: 2026-10-16 15:40:09.127558
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e7b35d10f8c2'
+down_revision: Union[str, Sequence[str], None] = 'c41f7e09ab23'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # active sessions only, stays small as rotated/revoked history grows
+    op.create_index('idx_refresh_token_active', 'refresh_tokens', ['user_id', 'expires_at'], unique=False, postgresql_where=sa.text('is_revoked = false AND is_rotated = false'))
+    op.create_index('idx_refresh_token_user_created', 'refresh_tokens', ['user_id', sa.text('created_at DESC')], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('idx_refresh_token_user_created', table_name='refresh_tokens')
+    op.drop_index('idx_refresh_token_active', table_name='refresh_tokens')
@@ -6,6 +6,7 @@ from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Form
 from fastapi.responses import FileResponse
 from sqlalchemy.orm import Session
 from typing import Optional
+import contextlib
 import tempfile
 import os
 from pathlib import Path
@@ -20,7 +21,7 @@ from app.crud.song import create_song_by_artist, create_song_by_band, create_son
 from app.crud.album import create_album, update_album
 from app.crud.band import create_band, update_band
 from app.crud.artist import update_artist
-from app.services.file_service import file_service
+from app.services.file_service import file_service, TEMP_DIR
 from app.schemas.song_upload import (
     SongCreateWithUpload, SongCreateWithUploadByArtist, 
     SongCreateWithUploadByBand, SongCreateWithUploadByAdmin,
@@ -34,6 +35,12 @@ from app.schemas.upload import FileUploadResponse, AudioUploadResponse, ImageUpl
 router = APIRouter()
 
 
+def _discard_file(path: Path) -> None:
+    """Remove an upload file, ignoring one that was already moved or deleted."""
+    with contextlib.suppress(FileNotFoundError):
+        os.unlink(path)
+
+
 @router.post("/song/artist", response_model=SongUploadResponse)
 async def create_song_with_upload_by_artist(
     audio_file: UploadFile = File(...),
@@ -52,18 +59,16 @@ async def create_song_with_upload_by_artist(
         if not audio_file.filename:
             raise HTTPException(status_code=400, detail="No file provided")
         
-        with tempfile.NamedTemporaryFile(delete=False, suffix=Path(audio_file.filename).suffix) as temp_file:
+        with tempfile.NamedTemporaryFile(delete=False, dir=TEMP_DIR, suffix=Path(audio_file.filename).suffix) as temp_file:
             content = await audio_file.read()
             temp_file.write(content)
             temp_path = Path(temp_file.name)
         
-        is_valid, error_msg = file_service.validate_audio_file(temp_path, audio_file.content_type)
+        is_valid, error_msg, metadata = await file_service.ingest_audio(temp_path, audio_file.content_type)
         if not is_valid:
-            os.unlink(temp_path)
+            _discard_file(temp_path)
             raise HTTPException(status_code=400, detail=error_msg)
         
-        metadata = file_service.get_audio_metadata(temp_path)
-        
         song_data = SongCreateWithUploadByArtist(
             title=title,
             genre_id=genre_id,
@@ -86,7 +91,12 @@ async def create_song_with_upload_by_artist(
             raise HTTPException(status_code=500, detail="Failed to save file")
         
         song.file_path = str(destination_path)
-        db.commit()
+        try:
+            db.commit()
+        except Exception:
+            # the file was already moved into place; don't leave it orphaned
+            _discard_file(destination_path)
+            raise
         db.refresh(song)
         
         return SongUploadResponse(
@@ -95,16 +105,13 @@ async def create_song_with_upload_by_artist(
             filename=filename,
             stream_url=f"/stream/song/{song.id}",
             duration=metadata.get("duration", 0),
-            file_size=temp_path.stat().st_size,
+            file_size=destination_path.stat().st_size,
             message="Song created and uploaded successfully"
         )
         
     except Exception as e:
-        if 'temp_path' in locals() and os.path.exists(temp_path):
-            try:
-                os.unlink(temp_path)
-            except OSError:
-                pass  # File might already be deleted
+        if 'temp_path' in locals():
+            _discard_file(temp_path)
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.post("/song/band", response_model=SongUploadResponse)
@@ -125,18 +132,16 @@ async def create_song_with_upload_by_band(
         if not audio_file.filename:
             raise HTTPException(status_code=400, detail="No file provided")
         
-        with tempfile.NamedTemporaryFile(delete=False, suffix=Path(audio_file.filename).suffix) as temp_file:
+        with tempfile.NamedTemporaryFile(delete=False, dir=TEMP_DIR, suffix=Path(audio_file.filename).suffix) as temp_file:
             content = await audio_file.read()
             temp_file.write(content)
             temp_path = Path(temp_file.name)
         
-        is_valid, error_msg = file_service.validate_audio_file(temp_path, audio_file.content_type)
+        is_valid, error_msg, metadata = await file_service.ingest_audio(temp_path, audio_file.content_type)
         if not is_valid:
-            os.unlink(temp_path)
+            _discard_file(temp_path)
             raise HTTPException(status_code=400, detail=error_msg)
         
-        metadata = file_service.get_audio_metadata(temp_path)
-        
         song_data = SongCreateWithUploadByBand(
             title=title,
             genre_id=genre_id,
@@ -159,7 +164,12 @@ async def create_song_with_upload_by_band(
             raise HTTPException(status_code=500, detail="Failed to save file")
         
         song.file_path = str(destination_path)
-        db.commit()
+        try:
+            db.commit()
+        except Exception:
+            # the file was already moved into place; don't leave it orphaned
+            _discard_file(destination_path)
+            raise
         db.refresh(song)
         
         return SongUploadResponse(
@@ -168,16 +178,13 @@ async def create_song_with_upload_by_band(
             filename=filename,
             stream_url=f"/stream/song/{song.id}",
             duration=metadata.get("duration", 0),
-            file_size=temp_path.stat().st_size,
+            file_size=destination_path.stat().st_size,
             message="Song created and uploaded successfully"
         )
         
     except Exception as e:
-        if 'temp_path' in locals() and os.path.exists(temp_path):
-            try:
-                os.unlink(temp_path)
-            except OSError:
-                pass  # File might already be deleted
+        if 'temp_path' in locals():
+            _discard_file(temp_path)
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.post("/song/admin", response_model=SongUploadResponse)
@@ -201,18 +208,16 @@ async def create_song_with_upload_by_admin(
         if not audio_file.filename:
             raise HTTPException(status_code=400, detail="No file provided")
         
-        with tempfile.NamedTemporaryFile(delete=False, suffix=Path(audio_file.filename).suffix) as temp_file:
+        with tempfile.NamedTemporaryFile(delete=False, dir=TEMP_DIR, suffix=Path(audio_file.filename).suffix) as temp_file:
             content = await audio_file.read()
             temp_file.write(content)
             temp_path = Path(temp_file.name)
         
-        is_valid, error_msg = file_service.validate_audio_file(temp_path, audio_file.content_type)
+        is_valid, error_msg, metadata = await file_service.ingest_audio(temp_path, audio_file.content_type)
         if not is_valid:
-            os.unlink(temp_path)
+            _discard_file(temp_path)
             raise HTTPException(status_code=400, detail=error_msg)
         
-        metadata = file_service.get_audio_metadata(temp_path)
-        
         song_data = SongCreateWithUploadByAdmin(
             title=title,
             genre_id=genre_id,
@@ -238,7 +243,12 @@ async def create_song_with_upload_by_admin(
             raise HTTPException(status_code=500, detail="Failed to save file")
         
         song.file_path = str(destination_path)
-        db.commit()
+        try:
+            db.commit()
+        except Exception:
+            # the file was already moved into place; don't leave it orphaned
+            _discard_file(destination_path)
+            raise
         db.refresh(song)
         
         return SongUploadResponse(
@@ -247,16 +257,13 @@ async def create_song_with_upload_by_admin(
             filename=filename,
             stream_url=f"/stream/song/{song.id}",
             duration=metadata.get("duration", 0),
-            file_size=temp_path.stat().st_size,
+            file_size=destination_path.stat().st_size,
             message="Song created and uploaded successfully"
         )
         
     except Exception as e:
-        if 'temp_path' in locals() and os.path.exists(temp_path):
-            try:
-                os.unlink(temp_path)
-            except OSError:
-                pass  # File might already be deleted
+        if 'temp_path' in locals():
+            _discard_file(temp_path)
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.post("/album", response_model=dict)
@@ -280,14 +287,14 @@ async def create_album_with_cover(
         if not cover_file.filename:
             raise HTTPException(status_code=400, detail="No file provided")
         
-        with tempfile.NamedTemporaryFile(delete=False, suffix=Path(cover_file.filename).suffix) as temp_file:
+        with tempfile.NamedTemporaryFile(delete=False, dir=TEMP_DIR, suffix=Path(cover_file.filename).suffix) as temp_file:
             content = await cover_file.read()
             temp_file.write(content)
             temp_path = Path(temp_file.name)
         
         is_valid, error_msg = file_service.validate_image_file(temp_path, cover_file.content_type)
         if not is_valid:
-            os.unlink(temp_path)
+            _discard_file(temp_path)
             raise HTTPException(status_code=400, detail=error_msg)
         
         album_data = AlbumCreate(
@@ -313,7 +320,12 @@ async def create_album_with_cover(
             raise HTTPException(status_code=500, detail="Failed to save file")
         
         album.cover_image = str(destination_path)
-        db.commit()
+        try:
+            db.commit()
+        except Exception:
+            # the file was already moved into place; don't leave it orphaned
+            _discard_file(destination_path)
+            raise
         db.refresh(album)
         
         return {
@@ -325,11 +337,8 @@ async def create_album_with_cover(
         }
         
     except Exception as e:
-        if 'temp_path' in locals() and os.path.exists(temp_path):
-            try:
-                os.unlink(temp_path)
-            except OSError:
-                pass  # File might already be deleted
+        if 'temp_path' in locals():
+            _discard_file(temp_path)
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.post("/band", response_model=dict)
@@ -349,14 +358,14 @@ async def create_band_with_profile(
         if not profile_file.filename:
             raise HTTPException(status_code=400, detail="No file provided")
         
-        with tempfile.NamedTemporaryFile(delete=False, suffix=Path(profile_file.filename).suffix) as temp_file:
+        with tempfile.NamedTemporaryFile(delete=False, dir=TEMP_DIR, suffix=Path(profile_file.filename).suffix) as temp_file:
             content = await profile_file.read()
             temp_file.write(content)
             temp_path = Path(temp_file.name)
         
         is_valid, error_msg = file_service.validate_image_file(temp_path, profile_file.content_type)
         if not is_valid:
-            os.unlink(temp_path)
+            _discard_file(temp_path)
             raise HTTPException(status_code=400, detail=error_msg)
         
         band_data = BandCreate(
@@ -378,7 +387,12 @@ async def create_band_with_profile(
             raise HTTPException(status_code=500, detail="Failed to save file")
         
         band.profile_picture = str(destination_path)
-        db.commit()
+        try:
+            db.commit()
+        except Exception:
+            # the file was already moved into place; don't leave it orphaned
+            _discard_file(destination_path)
+            raise
         db.refresh(band)
         
         return {
@@ -390,11 +404,8 @@ async def create_band_with_profile(
         }
         
     except Exception as e:
-        if 'temp_path' in locals() and os.path.exists(temp_path):
-            try:
-                os.unlink(temp_path)
-            except OSError:
-                pass  # File might already be deleted
+        if 'temp_path' in locals():
+            _discard_file(temp_path)
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.post("/artist/profile", response_model=dict)
@@ -411,23 +422,23 @@ async def upload_artist_profile(
         if not profile_file.filename:
             raise HTTPException(status_code=400, detail="No file provided")
         
-        with tempfile.NamedTemporaryFile(delete=False, suffix=Path(profile_file.filename).suffix) as temp_file:
+        with tempfile.NamedTemporaryFile(delete=False, dir=TEMP_DIR, suffix=Path(profile_file.filename).suffix) as temp_file:
             content = await profile_file.read()
             temp_file.write(content)
             temp_path = Path(temp_file.name)
         
         is_valid, error_msg = file_service.validate_image_file(temp_path, profile_file.content_type)
         if not is_valid:
-            os.unlink(temp_path)
+            _discard_file(temp_path)
             raise HTTPException(status_code=400, detail=error_msg)
         
         artist = db.query(Artist).filter(Artist.id == artist_id).first()
         if not artist:
-            os.unlink(temp_path)
+            _discard_file(temp_path)
             raise HTTPException(status_code=404, detail="Artist not found")
         
         if current_user.role != "admin" and artist.linked_user_account != current_user.id:
-            os.unlink(temp_path)
+            _discard_file(temp_path)
             raise HTTPException(status_code=403, detail="Not authorized to update this artist")
         
         filename = file_service.generate_unique_filename(profile_file.filename, artist.id, "artist")
@@ -435,11 +446,16 @@ async def upload_artist_profile(
         
         success = await file_service.save_uploaded_file(temp_path, destination_path)
         if not success:
-            os.unlink(temp_path)
+            _discard_file(temp_path)
             raise HTTPException(status_code=500, detail="Failed to save file")
         
         artist.artist_profile_image = str(destination_path)
-        db.commit()
+        try:
+            db.commit()
+        except Exception:
+            # the file was already moved into place; don't leave it orphaned
+            _discard_file(destination_path)
+            raise
         db.refresh(artist)
         
         return {
@@ -451,11 +467,8 @@ async def upload_artist_profile(
         }
         
     except Exception as e:
-        if 'temp_path' in locals() and os.path.exists(temp_path):
-            try:
-                os.unlink(temp_path)
-            except OSError:
-                pass  # File might already be deleted
+        if 'temp_path' in locals():
+            _discard_file(temp_path)
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.post("/song/cover", response_model=dict)
@@ -472,23 +485,23 @@ async def upload_song_cover(
         if not cover_file.filename:
             raise HTTPException(status_code=400, detail="No file provided")
         
-        with tempfile.NamedTemporaryFile(delete=False, suffix=Path(cover_file.filename).suffix) as temp_file:
+        with tempfile.NamedTemporaryFile(delete=False, dir=TEMP_DIR, suffix=Path(cover_file.filename).suffix) as temp_file:
             content = await cover_file.read()
             temp_file.write(content)
             temp_path = Path(temp_file.name)
         
         is_valid, error_msg = file_service.validate_image_file(temp_path, cover_file.content_type)
         if not is_valid:
-            os.unlink(temp_path)
+            _discard_file(temp_path)
             raise HTTPException(status_code=400, detail=error_msg)
         
         song = db.query(Song).filter(Song.id == song_id).first()
         if not song:
-            os.unlink(temp_path)
+            _discard_file(temp_path)
             raise HTTPException(status_code=404, detail="Song not found")
         
         if current_user.role != "admin" and song.uploaded_by_user_id != current_user.id:
-            os.unlink(temp_path)
+            _discard_file(temp_path)
             raise HTTPException(status_code=403, detail="Not authorized to update this song")
         
         filename = file_service.generate_unique_filename(cover_file.filename, song.id, "cover")
@@ -496,11 +509,16 @@ async def upload_song_cover(
         
         success = await file_service.save_uploaded_file(temp_path, destination_path)
         if not success:
-            os.unlink(temp_path)
+            _discard_file(temp_path)
             raise HTTPException(status_code=500, detail="Failed to save file")
         
         song.cover_image = str(destination_path)
-        db.commit()
+        try:
+            db.commit()
+        except Exception:
+            # the file was already moved into place; don't leave it orphaned
+            _discard_file(destination_path)
+            raise
         db.refresh(song)
         
         return {
@@ -513,5 +531,5 @@ async def upload_song_cover(
         
     except Exception as e:
         if 'temp_path' in locals():
-            os.unlink(temp_path)
+            _discard_file(temp_path)
         raise HTTPException(status_code=500, detail=str(e))
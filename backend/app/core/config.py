@@ -1,5 +1,5 @@
 from pydantic_settings import BaseSettings
-from pydantic import PostgresDsn
+from pydantic import Field, PostgresDsn, field_validator
 from typing import Optional
 
 
@@ -29,6 +29,20 @@ class Settings(BaseSettings):
     # Password pepper
     PASSWORD_PEPPER: str
 
+    # Uploads
+    UPLOAD_CONCURRENCY: int = Field(32, ge=1)  # max file saves running in worker threads at once
+
+    @field_validator("JWT_ALGORITHM")
+    @classmethod
+    def jwt_algorithm_is_hmac(cls, value: str) -> str:
+        """
+        Tokens are only issued and verified by this service, so a shared-secret
+        HMAC algorithm is enough and much cheaper to verify than RSA/EC.
+        """
+        if value not in ("HS256", "HS384", "HS512"):
+            raise ValueError("JWT_ALGORITHM must be HS256, HS384 or HS512")
+        return value
+
     # Test User Credentials (optional, only for development)
     TEST_ADMIN_USERNAME: Optional[str] = None
     TEST_ADMIN_EMAIL: Optional[str] = None
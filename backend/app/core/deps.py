@@ -6,7 +6,7 @@ from sqlalchemy.orm import Session
 from app.db.session import get_db
 from app.db.models.user import User
 from app.schemas.user import UserRole
-from app.services.auth import AuthService
+from app.services.auth import AuthService, validate_access_token
 from app.crud.user import get_user_by_id
 
 # HTTP Bearer token scheme for JWT authentication
@@ -33,11 +33,9 @@ def get_current_user(
         HTTPException (401): If token is invalid, expired, or user not found
         HTTPException (401): If authentication credentials are malformed
     """
-    auth_service = AuthService(db)
-    
     try:
         # Validate access token and extract user data
-        token_data = auth_service.validate_access_token(credentials.credentials)
+        token_data = validate_access_token(credentials.credentials)
         
         # Get complete user object from database
         user_id = int(token_data.user_id)
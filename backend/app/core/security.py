@@ -1,6 +1,9 @@
+import hashlib
+import secrets
+from dataclasses import dataclass
 from datetime import datetime, timedelta, timezone
 from typing import Optional, Dict, Any
-from argon2 import PasswordHasher, exceptions as argon2_exceptions
+from argon2 import PasswordHasher, Type, exceptions as argon2_exceptions, extract_parameters
 import jwt
 from jwt import ExpiredSignatureError, InvalidTokenError
 from app.core.custom_exception import JWTExpiredError, JWTDecodeError
@@ -8,11 +11,29 @@ from app.core.config import settings
 from app.core.custom_exception import PasswordVerificationError
 
 
-# Argon2id hasher defaults
+@dataclass(frozen=True, slots=True)
+class IssuedToken:
+    """
+    A freshly signed JWT together with its expiry, so callers
+    don't need to decode a token they just created.
+    """
+    token: str
+    exp: int  # Unix timestamp, same value as the "exp" claim
+
+
+# JWT signing material, resolved once at import instead of on every encode/decode
+_JWT_KEY = settings.JWT_SECRET_KEY.encode()
+_JWT_ALGORITHM = settings.JWT_ALGORITHM
+_JWT_ALGORITHMS = [_JWT_ALGORITHM]  # explicit allowlist for decode
+
+
+# Argon2id hasher, OWASP web-login profile (19 MiB, 2 iterations, 1 lane)
+# only hashes weaker than this profile are rehashed on login; hashes made with the
+# earlier, heavier 64 MiB / 3 iteration profile are kept rather than downgraded
 pwd_hasher = PasswordHasher(
-    time_cost=3,
-    memory_cost=64 * 1024,
-    parallelism=2,
+    time_cost=2,
+    memory_cost=19 * 1024,
+    parallelism=1,
     hash_len=32,
     salt_len=16
 )
@@ -49,7 +70,27 @@ def verify_password(plain_password: str, hashed_password: str) -> bool:
         # unknown hashing errors, re-raise
         raise e
 
-def create_access_token(subject: str, username: str, email: str, role: str, expires_delta: Optional[timedelta] = None, additional_claims: Optional[Dict[str, Any]] = None) -> str:
+def password_needs_rehash(hashed_password: str) -> bool:
+    """
+    Checks whether a stored hash is weaker than the current pwd_hasher profile
+    and should be replaced. Hashes at least as strong are left alone.
+    :param hashed_password: Hashed password from database
+    :return: True if the hash should be recomputed
+    """
+    try:
+        params = extract_parameters(hashed_password)
+    except argon2_exceptions.InvalidHashError:
+        return False
+    current = pwd_hasher
+    return (
+        params.type is not Type.ID
+        or params.time_cost < current.time_cost
+        or params.memory_cost < current.memory_cost
+        or params.hash_len < current.hash_len
+        or params.salt_len < current.salt_len
+    )
+
+def create_access_token(subject: str, username: str, email: str, role: str, expires_delta: Optional[timedelta] = None, additional_claims: Optional[Dict[str, Any]] = None, now: Optional[datetime] = None) -> IssuedToken:
     """
     Creates a JWT access token.
     Parameters:
@@ -59,11 +100,12 @@ def create_access_token(subject: str, username: str, email: str, role: str, expi
     - role: Role of the user (eg. admin, artist, listener)
     - expires_delta: Custom expiration duration (default: from settings)
     - additional_claims: Optional dict for extra fields
+    - now: Issue time, lets callers share one clock read per request (default: current time)
 
     Returns:
-    - Signed JWT token string
+    - IssuedToken with the signed JWT string and its exp timestamp
     """
-    now = datetime.now(timezone.utc)
+    now = now or datetime.now(timezone.utc)
     expire = now + (expires_delta or timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES))
     payload = {
         "sub": subject, # token subject, user_id
@@ -75,10 +117,11 @@ def create_access_token(subject: str, username: str, email: str, role: str, expi
         "role": role.lower(), # admin, artist, listener
         **(additional_claims or {}) # for future use 
     }
-    return jwt.encode(payload, settings.JWT_SECRET_KEY, algorithm=settings.JWT_ALGORITHM)
+    token = jwt.encode(payload, _JWT_KEY, algorithm=_JWT_ALGORITHM)
+    return IssuedToken(token=token, exp=payload["exp"])
 
 
-def create_refresh_token(subject: str, expires_delta: Optional[timedelta] = None) -> str:
+def create_refresh_token(subject: str, expires_delta: Optional[timedelta] = None, now: Optional[datetime] = None) -> IssuedToken:
     """
     Creates a JWT refresh token.
 
@@ -86,21 +129,32 @@ def create_refresh_token(subject: str, expires_delta: Optional[timedelta] = None
     - subject: Same as user ID
     - user_id: User's DB ID (can be used to revoke token via DB blacklist later)
     - expires_delta: custom expiry
+    - now: Issue time, lets callers share one clock read per request (default: current time)
 
     Returns:
-    - Signed JWT refresh token string
+    - IssuedToken with the signed JWT refresh token string and its exp timestamp
     """
-    now = datetime.now(timezone.utc)
+    now = now or datetime.now(timezone.utc)
     expire = now + (expires_delta or timedelta(minutes=settings.REFRESH_TOKEN_EXPIRE_MINUTES))
     payload = {
         "sub": subject,
         "exp": int(expire.timestamp()), # Unix timestamp for consistency
         "iat": int(now.timestamp()), # Unix timestamp for consistency
         "type": "refresh", # marks this token as a refresh token
+        "jti": secrets.token_urlsafe(16), # unique per token, so two issued in the same second differ
     }
-    return jwt.encode(payload, settings.JWT_SECRET_KEY, algorithm=settings.JWT_ALGORITHM)
+    token = jwt.encode(payload, _JWT_KEY, algorithm=_JWT_ALGORITHM)
+    return IssuedToken(token=token, exp=payload["exp"])
+
 
 
+def hash_token(token: str) -> str:
+    """
+    Fixed-width SHA-256 hex digest of a token, used to store and look up
+    refresh tokens without indexing the full JWT string.
+    """
+    return hashlib.sha256(token.encode()).hexdigest()
+
 
 def decode_token(token: str) -> Dict[str, Any]:
     """
@@ -108,7 +162,7 @@ def decode_token(token: str) -> Dict[str, Any]:
     Raises custom exceptions for expired or invalid tokens.
     """
     try:
-        return jwt.decode(token, settings.JWT_SECRET_KEY, algorithms=[settings.JWT_ALGORITHM])
+        return jwt.decode(token, _JWT_KEY, algorithms=_JWT_ALGORITHMS)
     except ExpiredSignatureError:
         raise JWTExpiredError()
     except InvalidTokenError:
@@ -470,7 +470,7 @@ def get_active_user_count(db: Session) -> int:
     """
     return db.query(User).filter(User.is_active == True).count()
 
-def update_last_login(db: Session, user_id: int) -> bool:
+def update_last_login(db: Session, user_id: int, commit: bool = True) -> bool:
     """
     Updates the user's last login timestamp.
     Called after successful authentication
@@ -478,15 +478,17 @@ def update_last_login(db: Session, user_id: int) -> bool:
     Args:
         db: Database session
         user_id: ID of the user
+        commit: Commit right away; pass False to leave the UPDATE in the
+            current transaction for the caller to commit
     Returns:
         bool: True if updated successfully, False if user not found
     """
-    user = get_user_by_id(db, user_id)
-    if not user:
-        return False
-    user.last_login = datetime.now(timezone.utc)
-    db.commit()
-    return True
+    updated = db.query(User).filter(User.id == user_id).update(
+        {"last_login": datetime.now(timezone.utc)}
+    )
+    if commit:
+        db.commit()
+    return updated > 0
 
 
 
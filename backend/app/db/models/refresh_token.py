@@ -1,5 +1,5 @@
 from datetime import datetime, timezone
-from sqlalchemy import Column, Integer, DateTime, Boolean, Text, Index
+from sqlalchemy import Column, Integer, String, DateTime, Boolean, Index, text
 from app.db.base_class import Base
 
 
@@ -8,7 +8,7 @@ class RefreshToken(Base):
 
     id = Column(Integer, primary_key=True)  # Primary Key
     # Token Info
-    token = Column(Text, nullable=False, unique=True, index=True)
+    token_hash = Column(String(64), nullable=False, unique=True, index=True)  # sha256 hex of token, used for lookups
     user_id = Column(Integer, nullable=False, index=True)
     expires_at = Column(DateTime(timezone=True), nullable=False)  # Expiration
     
@@ -29,6 +29,17 @@ class RefreshToken(Base):
         Index("idx_refresh_token_revoked", "is_revoked"),
         Index("idx_refresh_token_rotated", "is_rotated"),
         Index("idx_refresh_token_previous", "previous_token_id"),
+        # active sessions only (logout_all_sessions), stays small as history grows
+        Index(
+            "idx_refresh_token_active",
+            "user_id",
+            "expires_at",
+            postgresql_where=text("is_revoked = false AND is_rotated = false"),
+        ),
+        # newest-first per user (get_token_rotation_history)
+        Index("idx_refresh_token_user_created", user_id, created_at.desc()),
+        # partial index for the rotated-token sweep in cleanup_expired_tokens
+        Index("idx_refresh_token_rotated_at", "rotated_at", postgresql_where=text("is_rotated = true")),
     )
 
     def __repr__(self):
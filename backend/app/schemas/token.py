@@ -80,6 +80,8 @@ class TokenResponse(BaseModel):
     email: str
     role: str
 
+    model_config = ConfigDict(from_attributes=True, frozen=True)
+
 
 class TokenValidation(BaseModel):
     """Schema for token validation requests"""
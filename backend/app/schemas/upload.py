@@ -2,7 +2,7 @@
 Schemas for file upload and metadata responses.
 """
 
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, ConfigDict, Field
 from typing import Optional, Dict, Any
 from datetime import datetime
 
@@ -66,3 +66,5 @@ class FileInfo(BaseModel):
     updated_at: Optional[datetime] = Field(default=None, description="File last update timestamp")
     is_public: bool = Field(description="Whether file is publicly accessible")
     access_url: Optional[str] = Field(default=None, description="Public access URL")
+
+    model_config = ConfigDict(from_attributes=True, frozen=True)
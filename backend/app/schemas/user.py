@@ -1,9 +1,27 @@
 from typing import Optional, Annotated
 from datetime import datetime
-from pydantic import BaseModel, EmailStr, StringConstraints, field_validator
-import re
+from pydantic import BaseModel, ConfigDict, EmailStr, StringConstraints, field_validator
 import enum
 
+__all__ = [
+    "UserRole",
+    "ShortStr",
+    "PasswordStr",
+    "validate_password_strength",
+    "UserBase",
+    "UserBaseWithRole",
+    "UserBaseWithPassword",
+    "UserBaseWithRoleAndPassword",
+    "UserSignup",
+    "UserCreate",
+    "UserUpdate",
+    "UserPasswordUpdate",
+    "UserLogin",
+    "UserOut",
+    "UserInDB",
+    "UserStatus",
+]
+
 # Enums for User Roles
 class UserRole(str, enum.Enum):
     admin = "admin"
@@ -19,11 +37,11 @@ def validate_password_strength(value: str) -> str:
     """
     Enforces strong password: One uppercase, one lowercase, one special char
     """
-    if not re.search(r"[A-Z]", value):
+    if not any(c.isupper() for c in value):
         raise ValueError("Password must include at least one uppercase letter.")
-    if not re.search(r"[a-z]", value):
+    if not any(c.islower() for c in value):
         raise ValueError("Password must include at least one lowercase letter.")
-    if not re.search(r"[\W_]", value):
+    if all(c.isalnum() for c in value):
         raise ValueError("Password must include at least one special character.")
     return value
 
@@ -34,16 +52,13 @@ class UserBase(BaseModel):
     last_name: ShortStr
     email: EmailStr
 
-    class Config:
-        from_attributes = True
+    model_config = ConfigDict(from_attributes=True)
 
 # UserBase with role - for cases where role is needed
 class UserBaseWithRole(UserBase):
     role: UserRole
 
-    class Config:
-        from_attributes = True
-        use_enum_values = True  # Ensures role = "admin", not UserRole.admin
+    model_config = ConfigDict(from_attributes=True, use_enum_values=True)  # Ensures role = "admin", not UserRole.admin
 
 # UserBase with password - for signup/creation
 class UserBaseWithPassword(UserBase):
@@ -78,8 +93,7 @@ class UserUpdate(UserBase):
     last_name: Optional[ShortStr] = None
     email: Optional[EmailStr] = None
 
-    class Config:
-        from_attributes = True
+    model_config = ConfigDict(from_attributes=True)
 
 # Password update schema
 class UserPasswordUpdate(BaseModel):
@@ -98,13 +112,12 @@ class UserLogin(BaseModel):
 
 # Output schema - includes all user fields plus system fields
 class UserOut(UserBaseWithRole):
+    email: str  # already validated on the way in, skip email_validator on output
     id: int
     is_active: bool
     created_at: datetime
 
-    class Config:
-        from_attributes = True
-        use_enum_values = True  # Ensures JSON contains string values for enums
+    model_config = ConfigDict(from_attributes=True, use_enum_values=True)  # Ensures JSON contains string values for enums
 
 # Database schema - includes hashed password
 class UserInDB(UserOut):
@@ -116,5 +129,4 @@ class UserStatus(BaseModel):
     disabled_at: Optional[datetime]
     last_login: Optional[datetime]
 
-    class Config:
-        from_attributes = True
+    model_config = ConfigDict(from_attributes=True)
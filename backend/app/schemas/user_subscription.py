@@ -1,7 +1,7 @@
 from typing import Optional, List, Annotated
 from datetime import datetime
 from decimal import Decimal
-from pydantic import BaseModel, Field, model_validator
+from pydantic import BaseModel, ConfigDict, Field, model_validator
 
 
 # Base schema for user subscription
@@ -20,8 +20,7 @@ class UserSubscriptionBase(BaseModel):
             raise ValueError("end_date must be after start_date")
         return self
 
-    class Config:
-        from_attributes = True
+    model_config = ConfigDict(from_attributes=True)
 
 
 class UserSubscriptionCreate(UserSubscriptionBase):
@@ -34,8 +33,7 @@ class UserSubscriptionUpdate(BaseModel):
     is_cancelled: Optional[bool] = None
     cancelled_at: Optional[datetime] = None
 
-    class Config:
-        from_attributes = True
+    model_config = ConfigDict(from_attributes=True)
 
 
 class UserSubscriptionOut(UserSubscriptionBase):
@@ -43,8 +41,7 @@ class UserSubscriptionOut(UserSubscriptionBase):
     cancelled_at: Optional[datetime] = None
     created_at: datetime
 
-    class Config:
-        from_attributes = True
+    model_config = ConfigDict(from_attributes=True, frozen=True)  # response DTO, never mutated
 
 
 # Schemas for relationships
@@ -55,8 +52,7 @@ class UserMinimal(BaseModel):
     last_name: str
     email: str
 
-    class Config:
-        from_attributes = True
+    model_config = ConfigDict(from_attributes=True)
 
 
 class SubscriptionPlanMinimal(BaseModel):
@@ -66,8 +62,7 @@ class SubscriptionPlanMinimal(BaseModel):
     duration_days: int
     description: Optional[str] = None
 
-    class Config:
-        from_attributes = True
+    model_config = ConfigDict(from_attributes=True)
 
 
 # User subscription output with relationships
@@ -83,6 +78,8 @@ class UserSubscriptionWithStatus(UserSubscriptionWithRelations):
     is_expired: bool
     can_renew: bool
 
+    model_config = ConfigDict(frozen=False)  # status fields are derived and may be filled in after construction
+
 
 # List schemas for pagination
 class UserSubscriptionList(BaseModel):
@@ -1,5 +1,9 @@
+import hashlib
+import threading
+import time
 from datetime import datetime, timedelta, timezone
-from typing import Optional, List
+from typing import Optional, List, Dict, Tuple
+from sqlalchemy import Row, bindparam, select, update
 from sqlalchemy.orm import Session
 from fastapi import HTTPException, status
 
@@ -7,47 +11,168 @@ from app.db.models.user import User
 from app.db.models.refresh_token import RefreshToken
 from app.schemas.user import UserLogin
 from app.schemas.token import TokenResponse, TokenData
+from app.core.custom_exception import PasswordVerificationError
 from app.core.security import (
+    hash_password,
     verify_password, 
+    password_needs_rehash,
     create_access_token, 
     create_refresh_token, 
-    decode_token
+    decode_token,
+    hash_token
+)
+from app.crud.user import get_user_by_username, update_last_login
+
+# verified against on unknown usernames so a miss costs the same as a real check
+_DUMMY_PASSWORD_HASH = hash_password("not-a-real-password-dummy-placeholder")
+
+# Process-wide cache of verified access tokens, keyed by a digest of the token.
+# Entries live at most ACCESS_TOKEN_CACHE_TTL seconds and are only stored for tokens
+# that stay valid longer than that, so a hit can never outlive the token's exp.
+ACCESS_TOKEN_CACHE_TTL = 30  # seconds
+ACCESS_TOKEN_CACHE_MAXSIZE = 10_000
+_access_token_cache: Dict[bytes, Tuple[TokenData, float]] = {}
+_access_token_cache_lock = threading.Lock()
+
+
+def clear_access_token_cache() -> None:
+    """
+    Drops all cached access token verifications in this process.
+    """
+    with _access_token_cache_lock:
+        _access_token_cache.clear()
+
+
+def _cache_access_token(key: bytes, token_data: TokenData, expires: float) -> None:
+    """
+    Stores a verified token, evicting the oldest entry when the cache is full.
+    """
+    with _access_token_cache_lock:
+        if len(_access_token_cache) >= ACCESS_TOKEN_CACHE_MAXSIZE:
+            _access_token_cache.pop(next(iter(_access_token_cache)))
+        _access_token_cache[key] = (token_data, expires)
+
+
+def validate_access_token(token: str) -> TokenData:
+    """
+    Validates an access token and returns token data.
+    Needs no database access, so it lives outside AuthService and is used
+    directly as part of the auth dependencies.
+    Successful verifications are cached for ACCESS_TOKEN_CACHE_TTL seconds;
+    failures are never cached.
+    Args:
+        token: Access token to validate
+    Returns:
+        TokenData with user information
+    Raises:
+        HTTPException: If token is invalid or expired
+    """
+    # same token recently verified by this process
+    key = hashlib.blake2b(token.encode(), digest_size=16).digest()
+    now = time.time()
+    entry = _access_token_cache.get(key)
+    if entry is not None and entry[1] > now:
+        return entry[0]
+
+    try:
+        token_data = decode_token(token)
+    except Exception:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Invalid access token"
+        )
+    
+    # check if it's an access token
+    if token_data.get("type") != "access":
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Invalid token type"
+        )
+    
+    validated = TokenData(
+        user_id=token_data.get("sub"),
+        username=token_data.get("username"),
+        email=token_data.get("email"),
+        role=token_data.get("role"),
+        token_type=token_data.get("type")
+    )
+    if token_data["exp"] - now > ACCESS_TOKEN_CACHE_TTL:
+        _cache_access_token(key, validated, now + ACCESS_TOKEN_CACHE_TTL)
+    return validated
+
+
+# Refresh token lookups, built once at import and executed with bound parameters
+_REFRESH_TOKEN_BY_HASH = select(
+    RefreshToken.id,
+    RefreshToken.user_id,
+    RefreshToken.is_revoked,
+    RefreshToken.is_rotated,
+    RefreshToken.expires_at
+).where(RefreshToken.token_hash == bindparam("token_hash"))
+
+_ACTIVE_REFRESH_TOKEN_USER = (
+    select(
+        RefreshToken.id.label("token_id"),
+        User.id,
+        User.username,
+        User.email,
+        User.role
+    )
+    .join(User, User.id == RefreshToken.user_id)
+    .where(
+        RefreshToken.token_hash == bindparam("token_hash"),
+        RefreshToken.user_id == bindparam("user_id"),
+        RefreshToken.is_revoked == False,
+        RefreshToken.is_rotated == False,
+        RefreshToken.expires_at > bindparam("now"),
+        User.is_active == True
+    )
 )
-from app.crud.user import get_user_by_username, get_user_by_id, update_last_login
 
 
 class AuthService:
     """
     Authentication service handling login, token management, and logout.
     """
+    __slots__ = ("db",)
+
     def __init__(self, db: Session):
         self.db = db
 
     def authenticate_user(self, login_data: UserLogin) -> Optional[User]:
         """
         Authenticates a user with username and password.
+        Pending writes (last login, password rehash) are committed by create_tokens.
         Args:
             login_data: User login credentials
         Returns:
-            User object if authentication successful, else None 
+            User object if authentication successful, None for an unknown
+            username or wrong password
         Raises:
-            HTTPException: If user is inactive or authentication fails
+            HTTPException: If the credentials are valid but the user is inactive
         """
         # find user by username
         user = get_user_by_username(self.db, login_data.username)
+        # always run exactly one hash check, against a dummy hash for unknown usernames,
+        # so response time doesn't reveal whether the username exists
+        try:
+            verify_password(login_data.password, user.password if user else _DUMMY_PASSWORD_HASH)
+        except PasswordVerificationError:
+            return None
         if not user:
             return None
-        # check if user is active
+        # check if user is active, only once the password is known to be right
         if not user.is_active:
             raise HTTPException(
                 status_code=status.HTTP_401_UNAUTHORIZED,
                 detail="Account is disabled"
             )
-        # verify password
-        if not verify_password(login_data.password, user.password):
-            return None
-        # update last login time
-        update_last_login(self.db, user.id)
+        # rehash only hashes weaker than the current Argon2 profile
+        if password_needs_rehash(user.password):
+            user.password = hash_password(login_data.password)
+        # update last login time; left uncommitted so it lands in the same
+        # transaction as the refresh token stored by create_tokens
+        update_last_login(self.db, user.id, commit=False)
         return user
 
     def create_tokens(self, user: User) -> TokenResponse:
@@ -58,26 +183,26 @@ class AuthService:
         Returns:
             TokenResponse with both access and refresh tokens
         """
+        now = datetime.now(timezone.utc)
         # create access token
         access_token = create_access_token(
             subject=str(user.id),
             username=user.username,
             email=user.email,
-            role=user.role
+            role=user.role,
+            now=now
         )
         # create refresh token
-        refresh_token = create_refresh_token(subject=str(user.id))
+        refresh_token = create_refresh_token(subject=str(user.id), now=now)
         # store refresh token in database
-        self._store_refresh_token(refresh_token, user.id)
+        self._store_refresh_token(refresh_token.token, refresh_token.exp, user.id)
         
-        # decode access token to get expiration (now returns Unix timestamp)
-        token_data = decode_token(access_token)
-        current_time = int(datetime.now(timezone.utc).timestamp())
-        expires_in = token_data["exp"] - current_time
+        # expiration is known from issuing, no need to decode the token again
+        expires_in = access_token.exp - int(now.timestamp())
         
         return TokenResponse(
-            access_token=access_token,
-            refresh_token=refresh_token,
+            access_token=access_token.token,
+            refresh_token=refresh_token.token,
             token_type="bearer",
             expires_in=expires_in,
             user_id=str(user.id),
@@ -111,49 +236,50 @@ class AuthService:
                 status_code=status.HTTP_401_UNAUTHORIZED,
                 detail="Invalid token type"
             )
-        # check if token is revoked/rotated in database
-        db_token = self._get_refresh_token(refresh_token)
-        if not db_token or db_token.is_revoked or db_token.is_rotated:
+        # one query checks the token is stored, not revoked/rotated/expired,
+        # and belongs to an active user
+        now = datetime.now(timezone.utc)
+        user = self._get_active_refresh_token_user(refresh_token, int(token_data["sub"]), now)
+        if not user:
             raise HTTPException(
                 status_code=status.HTTP_401_UNAUTHORIZED,
-                detail="Refresh token has been revoked or rotated"
+                detail="Refresh token is revoked, expired or its user is inactive"
             )
-        # check if token has expired
-        if datetime.now(timezone.utc) > db_token.expires_at:
-            raise HTTPException(
-                status_code=status.HTTP_401_UNAUTHORIZED,
-                detail="Refresh token has expired"
+        # mark old token as rotated; re-checking its state makes the rotation single-use
+        # even when two refreshes with the same token pass the lookup concurrently
+        rotated = self.db.execute(
+            update(RefreshToken)
+            .where(
+                RefreshToken.id == user.token_id,
+                RefreshToken.is_rotated == False,
+                RefreshToken.is_revoked == False
             )
-        # get user
-        user_id = int(token_data["sub"])
-        user = get_user_by_id(self.db, user_id)
-        if not user or not user.is_active:
+            .values(is_rotated=True, rotated_at=now)
+        )
+        if rotated.rowcount != 1:
+            self.db.rollback()
             raise HTTPException(
                 status_code=status.HTTP_401_UNAUTHORIZED,
-                detail="User not found or inactive"
+                detail="Refresh token is revoked, expired or its user is inactive"
             )
         # create new access token
         new_access_token = create_access_token(
             subject=str(user.id),
             username=user.username,
             email=user.email,
-            role=user.role
+            role=user.role,
+            now=now
         )
         # create new refresh token for rotation 
-        new_refresh_token = create_refresh_token(subject=str(user.id))
-        # mark old token as rotated
-        db_token.is_rotated = True
-        db_token.rotated_at = datetime.now(timezone.utc)
-        # store new refresh token with link to previous
-        new_db_token = self._store_refresh_token(new_refresh_token, user.id, db_token.id)
-        # decode to get expiration
-        new_token_data = decode_token(new_access_token)
+        new_refresh_token = create_refresh_token(subject=str(user.id), now=now)
+        # store new refresh token with link to previous, committed together with the rotation
+        self._store_refresh_token(new_refresh_token.token, new_refresh_token.exp, user.id, user.token_id, commit=False)
+        self.db.commit()
         # Calculate expiration using Unix timestamps
-        current_time = int(datetime.now(timezone.utc).timestamp())
-        expires_in = new_token_data["exp"] - current_time
+        expires_in = new_access_token.exp - int(now.timestamp())
         return TokenResponse(
-            access_token=new_access_token,
-            refresh_token=new_refresh_token,  # new rotated refresh token
+            access_token=new_access_token.token,
+            refresh_token=new_refresh_token.token,  # new rotated refresh token
             token_type="bearer",
             expires_in=expires_in,
             user_id=str(user.id),
@@ -174,8 +300,11 @@ class AuthService:
         # find and revoke the refresh token
         db_token = self._get_refresh_token(refresh_token)
         if db_token and db_token.user_id == user_id:
-            db_token.is_revoked = True
-            db_token.revoked_at = datetime.now(timezone.utc)
+            self.db.execute(
+                update(RefreshToken)
+                .where(RefreshToken.id == db_token.id)
+                .values(is_revoked=True, revoked_at=datetime.now(timezone.utc))
+            )
             self.db.commit()
             return True
         return False
@@ -188,75 +317,40 @@ class AuthService:
         Returns:
             Number of sessions revoked
         """
-        # find all active refresh tokens for user [not revoked, not rotated, not expired]
-        tokens = self.db.query(RefreshToken).filter(
+        now = datetime.now(timezone.utc)
+        # revoke all active refresh tokens for user [not revoked, not rotated, not expired]
+        # in a single UPDATE, without loading the rows
+        stmt = update(RefreshToken).where(
             RefreshToken.user_id == user_id,
             RefreshToken.is_revoked == False,
             RefreshToken.is_rotated == False,
-            RefreshToken.expires_at > datetime.now(timezone.utc)
-        ).all()
-        
-        # revoke all tokens
-        revoked_count = 0
-        for token in tokens:
-            token.is_revoked = True
-            token.revoked_at = datetime.now(timezone.utc)
-            revoked_count += 1
+            RefreshToken.expires_at > now
+        ).values(is_revoked=True, revoked_at=now)
+        result = self.db.execute(stmt)
         
         self.db.commit()
-        return revoked_count
+        # issued access tokens stay valid until they expire; only refresh tokens are revoked
+        return result.rowcount
 
-    def validate_access_token(self, token: str) -> TokenData:
-        """
-        Validates an access token and returns token data.
-        Args:
-            token: Access token to validate
-        Returns:
-            TokenData with user information
-        Raises:
-            HTTPException: If token is invalid or expired
-        """
-        try:
-            token_data = decode_token(token)
-        except Exception:
-            raise HTTPException(
-                status_code=status.HTTP_401_UNAUTHORIZED,
-                detail="Invalid access token"
-            )
-        
-        # check if it's an access token
-        if token_data.get("type") != "access":
-            raise HTTPException(
-                status_code=status.HTTP_401_UNAUTHORIZED,
-                detail="Invalid token type"
-            )
-        
-        return TokenData(
-            user_id=token_data.get("sub"),
-            username=token_data.get("username"),
-            email=token_data.get("email"),
-            role=token_data.get("role"),
-            token_type=token_data.get("type")
-        )
-
-    def _store_refresh_token(self, token: str, user_id: int, previous_token_id: Optional[int] = None) -> RefreshToken:
+    def _store_refresh_token(self, token: str, exp: int, user_id: int, previous_token_id: Optional[int] = None, commit: bool = True) -> RefreshToken:
         """
         Stores a refresh token in the database.
         Args:
             token: Refresh token string
+            exp: Expiration of the token as a Unix timestamp (its "exp" claim)
             user_id: ID of the user
             previous_token_id: ID of the previous token in rotation chain (optional)
+            commit: Commit right away; pass False to only flush and let the caller
+                commit it together with its other writes
         Returns:
             RefreshToken object
         """
-        # decode token to get expiration (Unix timestamp)
-        token_data = decode_token(token)
         # Convert Unix timestamp to datetime for database storage
-        expires_at = datetime.fromtimestamp(token_data["exp"], tz=timezone.utc)
+        expires_at = datetime.fromtimestamp(exp, tz=timezone.utc)
         
         # create database record
         db_token = RefreshToken(
-            token=token,
+            token_hash=hash_token(token),
             user_id=user_id,
             expires_at=expires_at,
             is_revoked=False,
@@ -265,20 +359,43 @@ class AuthService:
         )
         
         self.db.add(db_token)
-        self.db.commit()
-        self.db.refresh(db_token)
+        if commit:
+            self.db.commit()
+        else:
+            # assigns db_token.id without ending the transaction
+            self.db.flush()
         
         return db_token
 
-    def _get_refresh_token(self, token: str) -> Optional[RefreshToken]:
+    def _get_refresh_token(self, token: str) -> Optional[Row]:
         """
-        Retrieves a refresh token from the database.
+        Retrieves the state of a refresh token from the database.
+        Only selects the columns the refresh/logout flows read, as a plain row
+        (no ORM object); callers update the token by id.
         Args:
             token: Refresh token string 
         Returns:
-            RefreshToken object if found, None otherwise
+            Row with id, user_id, is_revoked, is_rotated, expires_at if found, None otherwise
+        """
+        return self.db.execute(
+            _REFRESH_TOKEN_BY_HASH, {"token_hash": hash_token(token)}
+        ).first()
+
+    def _get_active_refresh_token_user(self, token: str, user_id: int, now: datetime) -> Optional[Row]:
+        """
+        Fetches an active refresh token together with its user in a single query.
+        Args:
+            token: Refresh token string
+            user_id: User ID from the token's sub claim
+            now: Current time, tokens expiring before it are ignored
+        Returns:
+            Row with token_id, id, username, email, role if the token is stored,
+            not revoked, rotated or expired and the user is active, None otherwise
         """
-        return self.db.query(RefreshToken).filter(RefreshToken.token == token).first()
+        return self.db.execute(
+            _ACTIVE_REFRESH_TOKEN_USER,
+            {"token_hash": hash_token(token), "user_id": user_id, "now": now}
+        ).first()
 
     def cleanup_expired_tokens(self) -> int:
         """
@@ -286,22 +403,18 @@ class AuthService:
         Returns:
             Number of tokens removed
         """
-        # remove expired tokens
-        expired_tokens = self.db.query(RefreshToken).filter(
-            RefreshToken.expires_at < datetime.now(timezone.utc)
-        ).all()
-        
-        # remove old rotated tokens (keep recent ones for audit)
-        old_rotated_tokens = self.db.query(RefreshToken).filter(
-            RefreshToken.is_rotated == True,
-            RefreshToken.rotated_at < datetime.now(timezone.utc) - timedelta(days=7)  # keep for 7 days
-        ).all()
+        now = datetime.now(timezone.utc)
         
-        tokens_to_delete = expired_tokens + old_rotated_tokens
-        count = len(tokens_to_delete)
+        # single DELETE per condition without loading the rows
+        count = self.db.query(RefreshToken).filter(
+            RefreshToken.expires_at < now
+        ).delete(synchronize_session=False)
         
-        for token in tokens_to_delete:
-            self.db.delete(token)
+        # old rotated tokens (keep recent ones for audit)
+        count += self.db.query(RefreshToken).filter(
+            RefreshToken.is_rotated == True,
+            RefreshToken.rotated_at < now - timedelta(days=7)  # keep for 7 days
+        ).delete(synchronize_session=False)
         
         self.db.commit()
         return count
@@ -3,17 +3,21 @@ File service for handling uploads, validation, and file management.
 Handles audio files, images, and metadata extraction.
 """
 
+import asyncio
+import errno
 import os
-import uuid
+import secrets
 import shutil
+import time
 from pathlib import Path
+from types import MappingProxyType
 from typing import Optional, Dict, Any, Tuple
-from datetime import datetime
-import aiofiles
 from mutagen import File as MutagenFile
 from PIL import Image
 import logging
 
+from app.core.config import settings
+
 logger = logging.getLogger(__name__)
 
 ALLOWED_AUDIO_TYPES = {
@@ -40,24 +44,107 @@ PROFILES_DIR = UPLOAD_BASE / "profiles"
 ALBUMS_DIR = UPLOAD_BASE / "albums"
 TEMP_DIR = UPLOAD_BASE / "temp"
 
+_TYPE_TO_DIR = MappingProxyType({
+    "song": SONGS_DIR,
+    "cover": COVERS_DIR,
+    "profile": PROFILES_DIR,
+    "album": ALBUMS_DIR
+})
+
+# create upload directories once per process
+for _directory in (SONGS_DIR, COVERS_DIR, PROFILES_DIR, ALBUMS_DIR, TEMP_DIR):
+    _directory.mkdir(parents=True, exist_ok=True)
+
+SENDFILE_CHUNK = 1 << 20  # 1MB per sendfile call when moving across filesystems
+COPY_BUFFER = 80 * 1024  # userspace copy buffer where sendfile is unavailable
+SMALL_FILE_SIZE = 16 * 1024 * 1024  # files below this are copied in a single read, covers all images
+
+# bounds concurrent saves so an upload burst can't take over the default thread pool
+_COPY_SEM = asyncio.Semaphore(settings.UPLOAD_CONCURRENCY)
+
+# metadata key -> tag name read from mutagen's easy tag interface
+_AUDIO_TAG_KEYS = (
+    ("title", "title"),
+    ("artist", "artist"),
+    ("album", "album"),
+    ("genre", "genre"),
+    ("year", "date")
+)
+
+# validation error messages, built once since the tables above are constant
+_AUDIO_SIZE_MSG = f"File too large. Maximum size is {MAX_AUDIO_SIZE // (1024*1024)}MB"
+_IMAGE_SIZE_MSG = f"File too large. Maximum size is {MAX_IMAGE_SIZE // (1024*1024)}MB"
+_AUDIO_TYPE_MSG = f"Unsupported audio format. Allowed: {', '.join(ALLOWED_AUDIO_TYPES)}"
+_IMAGE_TYPE_MSG = f"Unsupported image format. Allowed: {', '.join(ALLOWED_IMAGE_TYPES)}"
+_EXT_MISMATCH_MSGS = {
+    ext: f"File extension doesn't match content type. Expected: {ext}"
+    for ext in {*ALLOWED_AUDIO_TYPES.values(), *ALLOWED_IMAGE_TYPES.values()}
+}
+_CONTENT_MISMATCH_MSGS = {
+    ext: f"File contents don't match content type. Expected: {ext}"
+    for ext in {*ALLOWED_AUDIO_TYPES.values(), *ALLOWED_IMAGE_TYPES.values()}
+}
+
+# leading bytes -> extension, checked against the declared content type
+MAGIC_HEAD_SIZE = 12
+_AUDIO_MAGIC = (
+    (b'\xff\xfb', '.mp3'),  # MPEG-1 layer III frame sync
+    (b'\xff\xfa', '.mp3'),
+    (b'\xff\xf3', '.mp3'),  # MPEG-2 layer III frame sync
+    (b'\xff\xf2', '.mp3'),
+    (b'\xff\xe3', '.mp3'),  # MPEG-2.5 layer III frame sync
+    (b'\xff\xe2', '.mp3'),
+    (b'fLaC', '.flac')
+)
+_IMAGE_MAGIC = (
+    (b'\xff\xd8\xff', '.jpg'),
+    (b'\x89PNG\r\n\x1a\n', '.png')
+)
+# RIFF containers carry their form type at bytes 8-12
+_RIFF_FORMS = {
+    b'WAVE': '.wav',
+    b'WEBP': '.webp'
+}
+
+
+def _sniff_extension(head: bytes, magic_table: Tuple[Tuple[bytes, str], ...]) -> Optional[str]:
+    """Return the extension matching a file's leading bytes, or None if unrecognised."""
+    if head[:4] == b'RIFF':
+        return _RIFF_FORMS.get(head[8:12])
+    for magic, ext in magic_table:
+        if head.startswith(magic):
+            return ext
+    return None
+
+
+def _sniff_file(f, magic_table: Tuple[Tuple[bytes, str], ...]) -> Optional[str]:
+    """
+    Return the extension matching an open file's contents, looking past a leading
+    ID3v2 tag (which both MP3 and FLAC files may carry).
+    """
+    head = f.read(MAGIC_HEAD_SIZE)
+    if head[:3] != b'ID3' or len(head) < 10:
+        return _sniff_extension(head, magic_table)
+    
+    # 10 byte header, syncsafe tag size, optional 10 byte footer
+    tag_size = (
+        (head[6] & 0x7f) << 21 | (head[7] & 0x7f) << 14
+        | (head[8] & 0x7f) << 7 | (head[9] & 0x7f)
+    )
+    if head[5] & 0x10:
+        tag_size += 10
+    f.seek(10 + tag_size)
+    # an ID3 tag followed by unrecognised bytes is still taken as MP3
+    return _sniff_extension(f.read(MAGIC_HEAD_SIZE), magic_table) or '.mp3'
+
 
 class FileService:
     """Service for handling file uploads, validation, and management."""
     
-    def __init__(self):
-        """Initialize file service and ensure directories exist."""
-        self._ensure_directories()
-    
-    def _ensure_directories(self) -> None:
-        """Create upload directories if they don't exist."""
-        directories = [SONGS_DIR, COVERS_DIR, PROFILES_DIR, ALBUMS_DIR, TEMP_DIR]
-        for directory in directories:
-            directory.mkdir(parents=True, exist_ok=True)
-            logger.info(f"Ensured directory exists: {directory}")
-    
     def validate_audio_file(self, file_path: Path, content_type: str) -> Tuple[bool, str]:
         """
-        Validate audio file type and size.
+        Validate audio file type and size, checking the file's leading bytes
+        against the declared content type.
         
         Args:
             file_path: Path to the audio file
@@ -66,27 +153,31 @@ class FileService:
         Returns:
             Tuple of (is_valid, error_message)
         """
-        if not file_path.exists():
-            return False, "File not found"
-        
         try:
-            if file_path.stat().st_size > MAX_AUDIO_SIZE:
-                return False, f"File too large. Maximum size is {MAX_AUDIO_SIZE // (1024*1024)}MB"
-            
-            if content_type not in ALLOWED_AUDIO_TYPES:
-                return False, f"Unsupported audio format. Allowed: {', '.join(ALLOWED_AUDIO_TYPES.keys())}"
-            
-            expected_ext = ALLOWED_AUDIO_TYPES[content_type]
-            if file_path.suffix.lower() != expected_ext:
-                return False, f"File extension doesn't match content type. Expected: {expected_ext}"
+            with open(file_path, 'rb') as f:
+                if os.fstat(f.fileno()).st_size > MAX_AUDIO_SIZE:
+                    return False, _AUDIO_SIZE_MSG
+                
+                expected_ext = ALLOWED_AUDIO_TYPES.get(content_type)
+                if expected_ext is None:
+                    return False, _AUDIO_TYPE_MSG
+                
+                if file_path.suffix.lower() != expected_ext:
+                    return False, _EXT_MISMATCH_MSGS[expected_ext]
+                
+                if _sniff_file(f, _AUDIO_MAGIC) != expected_ext:
+                    return False, _CONTENT_MISMATCH_MSGS[expected_ext]
             
             return True, ""
+        except FileNotFoundError:
+            return False, "File not found"
         except OSError as e:
             return False, f"Error accessing file: {str(e)}"
     
     def validate_image_file(self, file_path: Path, content_type: str) -> Tuple[bool, str]:
         """
-        Validate image file type and size.
+        Validate image file type and size, checking the file's leading bytes
+        against the declared content type.
         
         Args:
             file_path: Path to the image file
@@ -95,21 +186,24 @@ class FileService:
         Returns:
             Tuple of (is_valid, error_message)
         """
-        if not file_path.exists():
-            return False, "File not found"
-        
         try:
-            if file_path.stat().st_size > MAX_IMAGE_SIZE:
-                return False, f"File too large. Maximum size is {MAX_IMAGE_SIZE // (1024*1024)}MB"
-            
-            if content_type not in ALLOWED_IMAGE_TYPES:
-                return False, f"Unsupported image format. Allowed: {', '.join(ALLOWED_IMAGE_TYPES.keys())}"
-            
-            expected_ext = ALLOWED_IMAGE_TYPES[content_type]
-            if file_path.suffix.lower() != expected_ext:
-                return False, f"File extension doesn't match content type. Expected: {expected_ext}"
+            with open(file_path, 'rb') as f:
+                if os.fstat(f.fileno()).st_size > MAX_IMAGE_SIZE:
+                    return False, _IMAGE_SIZE_MSG
+                
+                expected_ext = ALLOWED_IMAGE_TYPES.get(content_type)
+                if expected_ext is None:
+                    return False, _IMAGE_TYPE_MSG
+                
+                if file_path.suffix.lower() != expected_ext:
+                    return False, _EXT_MISMATCH_MSGS[expected_ext]
+                
+                if _sniff_file(f, _IMAGE_MAGIC) != expected_ext:
+                    return False, _CONTENT_MISMATCH_MSGS[expected_ext]
             
             return True, ""
+        except FileNotFoundError:
+            return False, "File not found"
         except OSError as e:
             return False, f"Error accessing file: {str(e)}"
     
@@ -127,7 +221,7 @@ class FileService:
         """
         ext = Path(original_filename).suffix.lower()
         
-        unique_id = str(uuid.uuid4())[:8]
+        unique_id = secrets.token_hex(4)
         
         return f"{file_type}_{file_id}_{unique_id}{ext}"
     
@@ -146,28 +240,25 @@ class FileService:
                 logger.error(f"File not found: {file_path}")
                 return {"duration": 0, "bitrate": 0}
             
-            audio = MutagenFile(str(file_path))
+            # easy=True maps ID3 frames to plain keys (title, artist, ...) for MP3
+            audio = MutagenFile(str(file_path), easy=True)
             
             if audio is None:
                 return {"duration": 0, "bitrate": 0}
             
+            info = audio.info
             metadata = {
-                "duration": int(audio.info.length) if hasattr(audio.info, 'length') else 0,
-                "bitrate": audio.info.bitrate if hasattr(audio.info, 'bitrate') else 0,
-                "sample_rate": audio.info.sample_rate if hasattr(audio.info, 'sample_rate') else 0,
-                "channels": audio.info.channels if hasattr(audio.info, 'channels') else 0
+                "duration": int(getattr(info, 'length', 0)),
+                "bitrate": getattr(info, 'bitrate', 0),
+                "sample_rate": getattr(info, 'sample_rate', 0),
+                "channels": getattr(info, 'channels', 0)
             }
             
-            if hasattr(audio, 'tags'):
-                tags = audio.tags
-                if tags:
-                    metadata.update({
-                        "title": str(tags.get('title', [''])[0]) if 'title' in tags else None,
-                        "artist": str(tags.get('artist', [''])[0]) if 'artist' in tags else None,
-                        "album": str(tags.get('album', [''])[0]) if 'album' in tags else None,
-                        "genre": str(tags.get('genre', [''])[0]) if 'genre' in tags else None,
-                        "year": str(tags.get('date', [''])[0]) if 'date' in tags else None
-                    })
+            tags = audio.tags
+            if tags:
+                for key, tag in _AUDIO_TAG_KEYS:
+                    value = tags.get(tag)
+                    metadata[key] = str(value[0]) if value else None
             
             return metadata
             
@@ -175,6 +266,27 @@ class FileService:
             logger.error(f"Error extracting audio metadata from {file_path}: {e}")
             return {"duration": 0, "bitrate": 0}
     
+    async def ingest_audio(self, temp_path: Path, content_type: str) -> Tuple[bool, str, Dict[str, Any]]:
+        """
+        Validate an uploaded audio file and, if it is valid, extract its metadata.
+        Both steps run in a single worker thread hop so the event loop is not blocked.
+        
+        Args:
+            temp_path: Temporary file path
+            content_type: MIME type of the file
+            
+        Returns:
+            Tuple of (is_valid, error_message, metadata); metadata is empty when invalid
+        """
+        return await asyncio.to_thread(self._ingest_audio_sync, temp_path, content_type)
+    
+    def _ingest_audio_sync(self, temp_path: Path, content_type: str) -> Tuple[bool, str, Dict[str, Any]]:
+        # only hand files that passed validation to the metadata parser
+        is_valid, error_msg = self.validate_audio_file(temp_path, content_type)
+        if not is_valid:
+            return False, error_msg, {}
+        return True, error_msg, self.get_audio_metadata(temp_path)
+    
     def get_image_metadata(self, file_path: Path) -> Dict[str, Any]:
         """
         Extract metadata from image file.
@@ -206,14 +318,45 @@ class FileService:
             temp_path: Temporary file path
             destination_path: Final destination path
             
+        Returns:
+            True if successful, False otherwise
+        """
+        async with _COPY_SEM:
+            return await asyncio.to_thread(self._sync_save, temp_path, destination_path)
+    
+    @staticmethod
+    def _sync_save(temp_path: Path, destination_path: Path) -> bool:
+        """
+        Move a file into place, renaming when possible and copying in the kernel otherwise.
+        Blocking; run it off the event loop.
+        
+        Args:
+            temp_path: Temporary file path, removed once the move succeeds
+            destination_path: Final destination path
+            
         Returns:
             True if successful, False otherwise
         """
         try:
             destination_path.parent.mkdir(parents=True, exist_ok=True)
             
-            shutil.copy2(temp_path, destination_path)
-            
+            try:
+                os.replace(temp_path, destination_path)
+            except OSError as e:
+                if e.errno != errno.EXDEV:
+                    raise
+                
+                # different filesystem: copy the bytes, then drop the temp file
+                with open(temp_path, "rb") as src, open(destination_path, "wb") as dst:
+                    if os.fstat(src.fileno()).st_size < SMALL_FILE_SIZE:
+                        # small files such as cover images: one read and one write
+                        dst.write(src.read())
+                    else:
+                        FileService._copy_fileobj(src, dst)
+                    dst.flush()
+                    os.fsync(dst.fileno())
+                shutil.copystat(temp_path, destination_path)
+                os.unlink(temp_path)
             
             logger.info(f"File saved successfully: {destination_path}")
             return True
@@ -222,6 +365,31 @@ class FileService:
             logger.error(f"Error saving file from {temp_path} to {destination_path}: {e}")
             return False
     
+    @staticmethod
+    def _copy_fileobj(src, dst) -> None:
+        """
+        Copy an open file to another, in the kernel with sendfile where supported
+        and through a COPY_BUFFER sized userspace buffer otherwise.
+        
+        Args:
+            src: Source file opened for binary reading
+            dst: Destination file opened for binary writing
+        """
+        if hasattr(os, "sendfile"):
+            offset = 0
+            try:
+                while True:
+                    sent = os.sendfile(dst.fileno(), src.fileno(), offset, SENDFILE_CHUNK)
+                    if sent == 0:
+                        return
+                    offset += sent
+            except OSError as e:
+                # only fall back if nothing was copied yet
+                if offset or e.errno not in (errno.EINVAL, errno.ENOSYS, errno.ENOTSUP):
+                    raise
+        
+        shutil.copyfileobj(src, dst, length=COPY_BUFFER)
+    
     def get_file_path(self, file_type: str, filename: str) -> Path:
         """
         Get the full path for a file based on its type.
@@ -233,15 +401,7 @@ class FileService:
         Returns:
             Full path to the file
         """
-        type_to_dir = {
-            "song": SONGS_DIR,
-            "cover": COVERS_DIR,
-            "profile": PROFILES_DIR,
-            "album": ALBUMS_DIR
-        }
-        
-        directory = type_to_dir.get(file_type, TEMP_DIR)
-        return directory / filename
+        return _TYPE_TO_DIR.get(file_type, TEMP_DIR) / filename
     
     def file_exists(self, file_type: str, filename: str) -> bool:
         """
@@ -270,10 +430,10 @@ class FileService:
         """
         try:
             file_path = self.get_file_path(file_type, filename)
-            if file_path.exists():
-                file_path.unlink()
-                logger.info(f"File deleted: {file_path}")
-                return True
+            file_path.unlink()
+            logger.info(f"File deleted: {file_path}")
+            return True
+        except FileNotFoundError:
             return False
         except Exception as e:
             logger.error(f"Error deleting file {filename}: {e}")
@@ -290,8 +450,10 @@ class FileService:
         Returns:
             File size in bytes
         """
-        file_path = self.get_file_path(file_type, filename)
-        return file_path.stat().st_size if file_path.exists() else 0
+        try:
+            return self.get_file_path(file_type, filename).stat().st_size
+        except FileNotFoundError:
+            return 0
     
     def cleanup_temp_files(self, max_age_hours: int = 24) -> int:
         """
@@ -305,15 +467,14 @@ class FileService:
         """
         try:
             cleaned_count = 0
-            current_time = datetime.now()
+            cutoff = time.time() - max_age_hours * 3600
             
-            for temp_file in TEMP_DIR.glob("*"):
-                if temp_file.is_file():
-                    file_age = current_time - datetime.fromtimestamp(temp_file.stat().st_mtime)
-                    if file_age.total_seconds() > max_age_hours * 3600:
-                        temp_file.unlink()
+            with os.scandir(TEMP_DIR) as entries:
+                for entry in entries:
+                    if entry.is_file() and entry.stat().st_mtime < cutoff:
+                        os.unlink(entry.path)
                         cleaned_count += 1
-                        logger.info(f"Cleaned up temp file: {temp_file}")
+                        logger.info(f"Cleaned up temp file: {entry.path}")
             
             return cleaned_count
             
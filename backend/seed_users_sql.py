@@ -16,7 +16,7 @@ backend_dir = Path(__file__).parent
 sys.path.insert(0, str(backend_dir))
 
 from sqlalchemy.orm import Session
-from sqlalchemy import text
+from sqlalchemy import bindparam, text
 from app.db.session import get_db
 from app.core.config import settings
 from app.core.security import hash_password
@@ -82,68 +82,107 @@ TEST_LISTENER_LAST_NAME=Listener
     }
 
 
-def create_test_user_sql(db: Session, user_data: dict, user_type: str):
-    """Create a test user using raw SQL"""
-    # Check if user already exists
-    result = db.execute(
-        text("SELECT id, username, role FROM users WHERE username = :username OR email = :email"),
-        {"username": user_data['username'], "email": user_data['email']}
-    ).first()
+def hash_passwords(users: dict) -> dict:
+    """Hash the test user passwords, keyed by user type"""
+    return {user_type: hash_password(user_data['password']) for user_type, user_data in users.items()}
+
+
+def create_test_users_sql(db: Session, users: dict, password_hashes: dict) -> dict:
+    """Create the test users with a single INSERT ... ON CONFLICT statement, fixing roles of existing ones"""
+    user_ids = {}
     
-    if result:
-        # If user exists but has wrong role, update it
-        if result.role != user_data['role']:
+    # A seed email may already belong to a user with another username. The upsert only
+    # resolves username conflicts, so reuse that user (as a username OR email match did)
+    # instead of letting uq_user_email abort the whole seed.
+    email_owners = {
+        row.email: row for row in db.execute(
+            text("SELECT id, username, email, role FROM users WHERE email IN :emails").bindparams(
+                bindparam("emails", expanding=True)
+            ),
+            {"emails": [user_data['email'] for user_data in users.values()]}
+        )
+    }
+    
+    to_upsert = {}
+    for user_type, user_data in users.items():
+        owner = email_owners.get(user_data['email'])
+        if owner is None or owner.username == user_data['username']:
+            to_upsert[user_type] = user_data
+            continue
+        
+        if owner.role != user_data['role']:
             db.execute(
                 text("UPDATE users SET role = :role WHERE id = :id"),
-                {"role": user_data['role'], "id": result.id}
+                {"role": user_data['role'], "id": owner.id}
             )
-            db.commit()
-            print(f"Updated {user_type.capitalize()} user '{user_data['username']}' role from '{result.role}' to '{user_data['role']}' (ID: {result.id})")
+            print(f"Updated {user_type.capitalize()} user '{owner.username}' (email '{user_data['email']}') role from '{owner.role}' to '{user_data['role']}' (ID: {owner.id})")
         else:
-            print(f"{user_type.capitalize()} user '{user_data['username']}' already exists with correct role (ID: {result.id})")
-        return result.id
+            print(f"{user_type.capitalize()} email '{user_data['email']}' already belongs to user '{owner.username}' with correct role (ID: {owner.id})")
+        user_ids[user_type] = owner.id
+    
+    if not to_upsert:
+        return user_ids
     
-    # Hash password
-    hashed_password = hash_password(user_data['password'])
     now = datetime.now(timezone.utc)
+    values = []
+    params = {"created_at": now, "is_active": True}
+    
+    for i, (user_type, user_data) in enumerate(to_upsert.items()):
+        values.append(
+            f"(:username_{i}, :email_{i}, :password_{i}, :first_name_{i}, :last_name_{i}, "
+            f":role_{i}, :created_at, :is_active)"
+        )
+        params.update({
+            f"username_{i}": user_data['username'],
+            f"email_{i}": user_data['email'],
+            f"password_{i}": password_hashes[user_type],
+            f"first_name_{i}": user_data['first_name'],
+            f"last_name_{i}": user_data['last_name'],
+            f"role_{i}": user_data['role']
+        })
     
-    # Create user using SQL
+    # only inserted rows and rows whose role changed are returned;
+    # xmax is 0 only for rows inserted by this statement
     result = db.execute(
-        text("""
+        text(f"""
         INSERT INTO users (username, email, password, first_name, last_name, role, created_at, is_active)
-        VALUES (:username, :email, :password, :first_name, :last_name, :role, :created_at, :is_active)
-        RETURNING id
+        VALUES {', '.join(values)}
+        ON CONFLICT (username) DO UPDATE SET role = EXCLUDED.role
+        WHERE users.role <> EXCLUDED.role
+        RETURNING id, username, (xmax = 0) AS inserted
         """),
-        {
-            "username": user_data['username'],
-            "email": user_data['email'],
-            "password": hashed_password,
-            "first_name": user_data['first_name'],
-            "last_name": user_data['last_name'],
-            "role": user_data['role'],
-            "created_at": now,
-            "is_active": True
-        }
+        params
     )
+    rows = {row.username: row for row in result}
+    
+    # look up the ids of users that already existed with the correct role
+    unchanged = [user_data['username'] for user_data in to_upsert.values() if user_data['username'] not in rows]
+    existing_ids = {}
+    if unchanged:
+        existing_ids = dict(db.execute(
+            text("SELECT username, id FROM users WHERE username IN :usernames").bindparams(
+                bindparam("usernames", expanding=True)
+            ),
+            {"usernames": unchanged}
+        ).all())
     
-    user_id = result.scalar()
-    db.commit()
-    print(f"Created {user_type} user: {user_data['username']} (ID: {user_id})")
-    return user_id
+    for user_type, user_data in to_upsert.items():
+        username = user_data['username']
+        row = rows.get(username)
+        if row is None:
+            user_ids[user_type] = existing_ids[username]
+            print(f"{user_type.capitalize()} user '{username}' already exists with correct role (ID: {user_ids[user_type]})")
+            continue
+        if row.inserted:
+            print(f"Created {user_type} user: {username} (ID: {row.id})")
+        else:
+            print(f"Updated {user_type.capitalize()} user '{username}' role to '{user_data['role']}' (ID: {row.id})")
+        user_ids[user_type] = row.id
+    return user_ids
 
 
 def create_test_artist_sql(db: Session, user_id: int, artist_data: dict):
     """Create a test artist profile using raw SQL"""
-    # Check if artist profile already exists
-    result = db.execute(
-        text("SELECT id FROM artists WHERE linked_user_account = :user_id"),
-        {"user_id": user_id}
-    ).first()
-    
-    if result:
-        print(f"Artist profile for user ID {user_id} already exists (ID: {result.id})")
-        return result.id
-    
     now = datetime.now(timezone.utc)
     
     # Create artist using SQL
@@ -152,6 +191,7 @@ def create_test_artist_sql(db: Session, user_id: int, artist_data: dict):
         INSERT INTO artists (artist_stage_name, artist_bio, artist_profile_image, artist_social_link, 
                            linked_user_account, created_at, is_disabled)
         VALUES (:stage_name, :bio, :profile_image, :social_link, :user_id, :created_at, :is_disabled)
+        ON CONFLICT (linked_user_account) DO NOTHING
         RETURNING id
         """),
         {
@@ -166,7 +206,15 @@ def create_test_artist_sql(db: Session, user_id: int, artist_data: dict):
     )
     
     artist_id = result.scalar()
-    db.commit()
+    if artist_id is None:
+        # Artist profile already exists
+        artist_id = db.execute(
+            text("SELECT id FROM artists WHERE linked_user_account = :user_id"),
+            {"user_id": user_id}
+        ).scalar()
+        print(f"Artist profile for user ID {user_id} already exists (ID: {artist_id})")
+        return artist_id
+    
     print(f"Created artist profile: {artist_data['stage_name']} (ID: {artist_id})")
     return artist_id
 
@@ -186,25 +234,23 @@ def main():
         print(f"Error loading environment variables: {e}")
         return
     
+    # Hash passwords before opening the transaction
+    password_hashes = hash_passwords(env_vars)
+    
     # Get database session
     db = next(get_db())
     
     try:
-        # Create admin user
-        print("\nCreating admin user...")
-        admin_user_id = create_test_user_sql(db, env_vars['admin'], 'admin')
-        
-        # Create musician user
-        print("\nCreating musician user...")
-        musician_user_id = create_test_user_sql(db, env_vars['musician'], 'musician')
+        # Create admin, musician and listener users
+        print("\nCreating users...")
+        user_ids = create_test_users_sql(db, env_vars, password_hashes)
         
         # Create artist profile for musician
         print("\nCreating artist profile...")
-        create_test_artist_sql(db, musician_user_id, env_vars['musician'])
+        create_test_artist_sql(db, user_ids['musician'], env_vars['musician'])
         
-        # Create listener user
-        print("\nCreating listener user...")
-        listener_user_id = create_test_user_sql(db, env_vars['listener'], 'listener')
+        # Everything above runs in one transaction
+        db.commit()
         
         print("\n" + "=" * 50)
         print("Seeding completed successfully!")
@@ -0,0 +1,90 @@
+"""
+Shared pytest fixtures.
+
+Settings are read at import time, so the required environment is filled in
+before anything from app is imported. Tests run against in-memory SQLite.
+"""
+
+import os
+
+os.environ.setdefault("POSTGRES_DB", "test")
+os.environ.setdefault("POSTGRES_USER", "test")
+os.environ.setdefault("POSTGRES_PASSWORD", "test")
+os.environ.setdefault("JWT_SECRET_KEY", "test-secret-key-" + "x" * 48)
+os.environ.setdefault("PASSWORD_PEPPER", "test-pepper")
+
+from datetime import timezone
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.dialects import registry
+from sqlalchemy.dialects.sqlite import DATETIME
+from sqlalchemy.dialects.sqlite.pysqlite import SQLiteDialect_pysqlite
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+from sqlalchemy.types import DateTime
+
+import app.db.base  # noqa: F401 registers all models
+from app.db.base_class import Base
+from app.db.models.refresh_token import RefreshToken
+from app.db.models.user import User
+from app.core.security import hash_password
+
+
+class _UTCDateTime(DATETIME):
+    """SQLite drops tzinfo; hand aware columns back as UTC like PostgreSQL does."""
+
+    def result_processor(self, dialect, coltype):
+        process = super().result_processor(dialect, coltype)
+
+        def attach_utc(value):
+            if process is not None:
+                value = process(value)
+            if value is not None and self.timezone and value.tzinfo is None:
+                return value.replace(tzinfo=timezone.utc)
+            return value
+
+        return attach_utc
+
+
+class _UTCSQLiteDialect(SQLiteDialect_pysqlite):
+    """pysqlite dialect whose DateTime columns use _UTCDateTime; the shared models stay untouched."""
+    supports_statement_cache = True
+    colspecs = {**SQLiteDialect_pysqlite.colspecs, DateTime: _UTCDateTime}
+
+
+registry.register("sqlite.utc", __name__, "_UTCSQLiteDialect")
+
+
+@pytest.fixture
+def db():
+    """Session bound to a fresh in-memory database with the auth tables."""
+    engine = create_engine(
+        "sqlite+utc://",
+        connect_args={"check_same_thread": False},
+        poolclass=StaticPool
+    )
+    Base.metadata.create_all(engine, tables=[User.__table__, RefreshToken.__table__])
+    session = sessionmaker(bind=engine, autoflush=False)()
+    try:
+        yield session
+    finally:
+        session.close()
+        engine.dispose()
+
+
+@pytest.fixture
+def user(db):
+    """Active listener whose password is "Passw0rd!"."""
+    user = User(
+        username="listener",
+        first_name="Test",
+        last_name="Listener",
+        email="listener@test.com",
+        password=hash_password("Passw0rd!"),
+        role="listener",
+        is_active=True
+    )
+    db.add(user)
+    db.commit()
+    return user
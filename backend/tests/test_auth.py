@@ -0,0 +1,107 @@
+import pytest
+from fastapi import HTTPException
+
+from app.core.security import hash_token
+from app.db.models.refresh_token import RefreshToken
+from app.schemas.user import UserLogin
+from app.services.auth import AuthService, clear_access_token_cache, validate_access_token
+
+
+@pytest.fixture
+def service(db):
+    return AuthService(db)
+
+
+@pytest.fixture(autouse=True)
+def empty_token_cache():
+    clear_access_token_cache()
+    yield
+    clear_access_token_cache()
+
+
+def _login(service: AuthService):
+    user = service.authenticate_user(UserLogin(username="listener", password="Passw0rd!"))
+    return service.create_tokens(user)
+
+
+def test_login_rejects_wrong_password(service, user):
+    assert service.authenticate_user(UserLogin(username="listener", password="Wr0ngPass!")) is None
+    assert service.authenticate_user(UserLogin(username="nobody", password="Passw0rd!")) is None
+
+
+def test_refresh_rotates_token(service, user):
+    tokens = _login(service)
+
+    rotated = service.refresh_access_token(tokens.refresh_token)
+    assert rotated.refresh_token != tokens.refresh_token
+
+    # the old refresh token is rejected once rotated
+    with pytest.raises(HTTPException) as exc:
+        service.refresh_access_token(tokens.refresh_token)
+    assert exc.value.status_code == 401
+
+    # the new one is accepted and can be rotated in turn
+    assert service.refresh_access_token(rotated.refresh_token).refresh_token != rotated.refresh_token
+
+
+def test_back_to_back_logins_get_distinct_tokens(service, user):
+    first = _login(service)
+    second = _login(service)
+    assert first.refresh_token != second.refresh_token
+
+
+def test_refresh_rejects_revoked_token(service, user):
+    tokens = _login(service)
+    assert service.logout(tokens.refresh_token, user.id)
+
+    with pytest.raises(HTTPException) as exc:
+        service.refresh_access_token(tokens.refresh_token)
+    assert exc.value.status_code == 401
+
+
+def test_refresh_rejects_inactive_user(service, db, user):
+    tokens = _login(service)
+    user.is_active = False
+    db.commit()
+
+    with pytest.raises(HTTPException):
+        service.refresh_access_token(tokens.refresh_token)
+
+
+def test_refresh_tokens_stored_as_hashes(service, db, user):
+    tokens = _login(service)
+    stored = db.query(RefreshToken).filter(RefreshToken.user_id == user.id).one()
+    assert stored.token_hash == hash_token(tokens.refresh_token)
+
+
+def test_access_token_validation(service, user):
+    tokens = _login(service)
+
+    token_data = validate_access_token(tokens.access_token)
+    assert token_data.username == "listener"
+    # a cached verification returns the same data
+    assert validate_access_token(tokens.access_token) == token_data
+
+    with pytest.raises(HTTPException):
+        validate_access_token(tokens.refresh_token)
+    with pytest.raises(HTTPException):
+        validate_access_token("not-a-jwt")
+
+
+def test_rotation_is_single_use(service, db, user, monkeypatch):
+    tokens = _login(service)
+    original_lookup = AuthService._get_active_refresh_token_user
+
+    def lookup_then_race(self, token, user_id, now):
+        # a concurrent refresh with the same token rotates it after this lookup passed
+        row = original_lookup(self, token, user_id, now)
+        db.query(RefreshToken).filter(RefreshToken.id == row.token_id).update({"is_rotated": True})
+        return row
+
+    monkeypatch.setattr(AuthService, "_get_active_refresh_token_user", lookup_then_race)
+
+    with pytest.raises(HTTPException) as exc:
+        service.refresh_access_token(tokens.refresh_token)
+    assert exc.value.status_code == 401
+    # no live child token was stored for the raced refresh
+    assert db.query(RefreshToken).filter(RefreshToken.previous_token_id.isnot(None)).count() == 0
@@ -0,0 +1,132 @@
+import asyncio
+import errno
+import os
+from pathlib import Path
+
+import pytest
+
+from app.services import file_service as fs
+from app.services.file_service import file_service
+
+
+ID3_TAG = b"ID3\x04\x00\x00\x00\x00\x00\x0a" + b"\x00" * 10  # ID3v2.4 header, 10 byte body
+
+AUDIO_CASES = [
+    ("mpeg1.mp3", "audio/mpeg", b"\xff\xfb\x90\x64" + b"\x00" * 16),
+    ("mpeg2.mp3", "audio/mpeg", b"\xff\xf3\x90\x64" + b"\x00" * 16),
+    ("mpeg25.mp3", "audio/mpeg", b"\xff\xe3\x90\x64" + b"\x00" * 16),
+    ("tagged.mp3", "audio/mpeg", ID3_TAG + b"\xff\xfb\x90\x64" + b"\x00" * 16),
+    ("plain.flac", "audio/flac", b"fLaC" + b"\x00" * 16),
+    ("tagged.flac", "audio/flac", ID3_TAG + b"fLaC" + b"\x00" * 16),
+    ("track.wav", "audio/wav", b"RIFF\x24\x00\x00\x00WAVEfmt " + b"\x00" * 8),
+]
+
+IMAGE_CASES = [
+    ("cover.jpg", "image/jpeg", b"\xff\xd8\xff\xe0" + b"\x00" * 16),
+    ("cover.png", "image/png", b"\x89PNG\r\n\x1a\n" + b"\x00" * 16),
+    ("cover.webp", "image/webp", b"RIFF\x24\x00\x00\x00WEBPVP8 " + b"\x00" * 8),
+]
+
+
+def _write(tmp_path: Path, name: str, content: bytes) -> Path:
+    path = tmp_path / name
+    path.write_bytes(content)
+    return path
+
+
+@pytest.mark.parametrize("name, content_type, content", AUDIO_CASES)
+def test_audio_magic_accepted(tmp_path, name, content_type, content):
+    path = _write(tmp_path, name, content)
+    assert file_service.validate_audio_file(path, content_type) == (True, "")
+
+
+@pytest.mark.parametrize("name, content_type, content", IMAGE_CASES)
+def test_image_magic_accepted(tmp_path, name, content_type, content):
+    path = _write(tmp_path, name, content)
+    assert file_service.validate_image_file(path, content_type) == (True, "")
+
+
+@pytest.mark.parametrize("name, content_type, content", [
+    ("renamed.mp3", "audio/mpeg", b"\x00\x00\x00\x20ftypM4A " + b"\x00" * 8),
+    ("flac.mp3", "audio/mpeg", b"fLaC" + b"\x00" * 16),
+    ("tagged.flac", "audio/flac", ID3_TAG + b"\xff\xfb\x90\x64" + b"\x00" * 16),
+    ("wave.flac", "audio/flac", b"RIFF\x24\x00\x00\x00WAVEfmt " + b"\x00" * 8),
+])
+def test_audio_magic_rejected(tmp_path, name, content_type, content):
+    path = _write(tmp_path, name, content)
+    is_valid, error = file_service.validate_audio_file(path, content_type)
+    assert not is_valid
+    assert error.startswith("File contents don't match content type")
+
+
+def test_image_magic_rejected(tmp_path):
+    path = _write(tmp_path, "fake.jpg", b"\x89PNG\r\n\x1a\n" + b"\x00" * 16)
+    is_valid, error = file_service.validate_image_file(path, "image/jpeg")
+    assert not is_valid
+    assert error.startswith("File contents don't match content type")
+
+
+def test_ingest_skips_metadata_for_invalid_audio(tmp_path, monkeypatch):
+    path = _write(tmp_path, "flac.mp3", b"fLaC" + b"\x00" * 16)
+
+    def parse(file_path):
+        raise AssertionError("metadata parsed before validation passed")
+
+    monkeypatch.setattr(file_service, "get_audio_metadata", parse)
+    is_valid, _, metadata = asyncio.run(file_service.ingest_audio(path, "audio/mpeg"))
+    assert not is_valid
+    assert metadata == {}
+
+
+def _cross_device_replace(src, dst):
+    raise OSError(errno.EXDEV, "Invalid cross-device link")
+
+
+def _save(temp_path: Path, destination_path: Path) -> bool:
+    return asyncio.run(file_service.save_uploaded_file(temp_path, destination_path))
+
+
+def test_save_moves_file(tmp_path):
+    temp_path = _write(tmp_path, "upload.tmp", b"audio")
+    destination_path = tmp_path / "songs" / "song.mp3"
+
+    assert _save(temp_path, destination_path)
+    assert not temp_path.exists()
+    assert destination_path.read_bytes() == b"audio"
+
+
+@pytest.mark.parametrize("small_file_size", [fs.SMALL_FILE_SIZE, 0], ids=["single-read", "streamed"])
+def test_save_copies_across_filesystems(tmp_path, monkeypatch, small_file_size):
+    monkeypatch.setattr(fs.os, "replace", _cross_device_replace)
+    monkeypatch.setattr(fs, "SMALL_FILE_SIZE", small_file_size)
+    content = os.urandom(3 * fs.SENDFILE_CHUNK + 123)
+    temp_path = _write(tmp_path, "upload.tmp", content)
+    destination_path = tmp_path / "songs" / "song.mp3"
+
+    assert _save(temp_path, destination_path)
+    assert not temp_path.exists()
+    assert destination_path.read_bytes() == content
+
+
+def test_save_copies_across_filesystems_without_sendfile(tmp_path, monkeypatch):
+    monkeypatch.setattr(fs.os, "replace", _cross_device_replace)
+    monkeypatch.setattr(fs, "SMALL_FILE_SIZE", 0)
+    monkeypatch.delattr(fs.os, "sendfile", raising=False)
+    content = os.urandom(2 * fs.COPY_BUFFER + 7)
+    temp_path = _write(tmp_path, "upload.tmp", content)
+    destination_path = tmp_path / "song.mp3"
+
+    assert _save(temp_path, destination_path)
+    assert not temp_path.exists()
+    assert destination_path.read_bytes() == content
+
+
+def test_save_failure_keeps_temp_file(tmp_path, monkeypatch):
+    def failing_replace(src, dst):
+        raise PermissionError(errno.EACCES, "Permission denied")
+
+    monkeypatch.setattr(fs.os, "replace", failing_replace)
+    temp_path = _write(tmp_path, "upload.tmp", b"audio")
+
+    assert not _save(temp_path, tmp_path / "song.mp3")
+    assert temp_path.read_bytes() == b"audio"
@@ -0,0 +1,51 @@
+from argon2 import PasswordHasher
+
+from app.core.config import settings
+from app.core.security import hash_password, password_needs_rehash
+from app.schemas.user import UserLogin
+from app.services.auth import AuthService
+
+
+def _hash_with(password: str, **params) -> str:
+    return PasswordHasher(hash_len=32, salt_len=16, **params).hash(password + settings.PASSWORD_PEPPER)
+
+
+def test_current_profile_is_not_rehashed():
+    assert not password_needs_rehash(hash_password("Passw0rd!"))
+
+
+def test_stronger_hash_is_kept():
+    stronger = _hash_with("Passw0rd!", time_cost=3, memory_cost=64 * 1024, parallelism=2)
+    assert not password_needs_rehash(stronger)
+
+
+def test_weaker_hash_is_rehashed():
+    weaker = _hash_with("Passw0rd!", time_cost=1, memory_cost=8 * 1024, parallelism=1)
+    assert password_needs_rehash(weaker)
+
+
+def test_login_rewrites_weak_hash(db, user):
+    weak = _hash_with("Passw0rd!", time_cost=1, memory_cost=8 * 1024, parallelism=1)
+    user.password = weak
+    db.commit()
+
+    service = AuthService(db)
+    authenticated = service.authenticate_user(UserLogin(username="listener", password="Passw0rd!"))
+    service.create_tokens(authenticated)
+
+    db.expire_all()
+    assert user.password != weak
+    assert not password_needs_rehash(user.password)
+
+
+def test_login_keeps_stronger_hash(db, user):
+    strong = _hash_with("Passw0rd!", time_cost=3, memory_cost=64 * 1024, parallelism=2)
+    user.password = strong
+    db.commit()
+
+    service = AuthService(db)
+    authenticated = service.authenticate_user(UserLogin(username="listener", password="Passw0rd!"))
+    service.create_tokens(authenticated)
+
+    db.expire_all()
+    assert user.password == strong